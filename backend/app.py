@@ -1,15 +1,27 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+import networkx as nx
+import json
+import math
 import random
+import threading
 import time
 import os
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 
-# Configurar Flask para servir archivos estáticos del frontend
-app = Flask(__name__, static_folder='../dist', static_url_path='')
+from jobs import FINISHED_STATES, InvalidSubscriber, JobManager, JobQueueFull
+from risk_engine import RiskEngine
+from snapshots import SnapshotStore
+from static_assets import StaticAssets
+
+# Los archivos del frontend se sirven desde memoria (ver static_assets.py)
+app = Flask(__name__, static_folder=None)
 CORS(app)
 
+DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dist')
+STATIC_ASSETS = StaticAssets(DIST_DIR)
+
 # Simulación de listas negras y datos de compliance
 BLACKLISTED_ADDRESSES = {
     '0x112233': {'type': 'ransomware', 'severity': 'high', 'description': 'Known ransomware wallet'},
@@ -25,6 +37,18 @@ ALERT_THRESHOLDS = {
     'suspicious_pattern': 0.8  # score de riesgo > 0.8
 }
 
+# Cola de trabajos para análisis largos (en memoria: requiere un solo worker de gunicorn)
+JOB_MANAGER = JobManager(
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    cache_size=int(os.environ.get('JOB_CACHE_SIZE', 64)),
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', 16))
+)
+
+# Cada stream SSE ocupa un hilo de gunicorn: se limita la cantidad y la duración
+JOB_STREAM_SLOTS = threading.BoundedSemaphore(int(os.environ.get('JOB_MAX_STREAMS', 2)))
+JOB_STREAM_MAX_SECONDS = int(os.environ.get('JOB_STREAM_MAX_SECONDS', 60))
+BETWEENNESS_CHUNK_SIZE = 32
+
 def generate_blockchain_data():
     nodes = [
         { 'id': '0x1a2b3c', 'name': 'Exchange Hub', 'isCritical': True, 'type': 'exchange', 'region': 'US', 'reputation': 0.9 },
@@ -77,6 +101,10 @@ def generate_blockchain_data():
     
     transactions = normal_txs + suspicious_txs + rapid_txs
 
+    return build_dataset(nodes, transactions)
+
+def build_dataset(nodes, transactions):
+    """Arma la respuesta completa (enlaces, alertas y métricas) para nodos y transacciones"""
     return {
         'nodes': nodes,
         'transactions': transactions,
@@ -268,23 +296,78 @@ def generate_alerts(transactions, nodes):
     
     return alerts
 
+def build_risk_engine(data):
+    """Crea un motor de riesgo para un conjunto de nodos y transacciones"""
+    return RiskEngine(
+        data['nodes'],
+        data['transactions'],
+        blacklist=BLACKLISTED_ADDRESSES,
+        large_transaction=ALERT_THRESHOLDS['large_transaction']
+    )
+
+def create_dataset_store():
+    """Inicializa el almacén de snapshots con los datos simulados"""
+    data = generate_blockchain_data()
+    return SnapshotStore(data['nodes'], data['transactions'], build_risk_engine(data))
+
+# Datos compartidos: los lectores fijan una versión y la ingesta publica la siguiente
+DATASET = create_dataset_store()
+
+def snapshot_data(snapshot):
+    """Datos completos (alertas, métricas) de un snapshot, calculados una vez por versión"""
+    return snapshot.derived('data', lambda s: build_dataset(list(s.nodes), list(s.transactions)))
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_transactions():
-    data = request.json
-    transactions = pd.DataFrame(data['transactions'])
-    nodes = pd.DataFrame(data['nodes'])
+    return jsonify(run_transaction_analysis(request.json))
+
+def report_progress(job, progress):
+    """Informa el progreso al trabajo (si se ejecuta en la cola)"""
+    if job is not None:
+        job.report(progress)
+
+def interruptible_betweenness(G, job, start, end):
+    """
+    Betweenness normalizada calculada por bloques de nodos origen, para poder
+    informar progreso y cancelar el trabajo entre bloques.
+    """
+    sources = list(G.nodes)
+    betweenness = dict.fromkeys(G.nodes, 0.0)
+    for i in range(0, len(sources), BETWEENNESS_CHUNK_SIZE):
+        chunk = sources[i:i + BETWEENNESS_CHUNK_SIZE]
+        partial = nx.betweenness_centrality_subset(G, sources=chunk, targets=sources, normalized=False)
+        for node_id, value in partial.items():
+            betweenness[node_id] += value
+        report_progress(job, start + (end - start) * (i + len(chunk)) / len(sources))
+
+    # Misma normalización que nx.betweenness_centrality para grafos dirigidos
+    n = len(sources)
+    if n > 2:
+        scale = 1 / ((n - 1) * (n - 2))
+        betweenness = {node_id: value * scale for node_id, value in betweenness.items()}
+    return betweenness
+
+def run_transaction_analysis(data, job=None):
+    """Construye el grafo de transacciones y calcula centralidades y riesgo"""
+    transactions = data['transactions']
+    nodes = data['nodes']
+    risk_engine = build_risk_engine(data)
 
     G = nx.DiGraph()
     
-    for _, node in nodes.iterrows():
+    for node in nodes:
         G.add_node(node['id'], name=node['name'], type=node['type'], isCritical=node['isCritical'])
     
-    for _, tx in transactions.iterrows():
+    for tx in transactions:
         G.add_edge(tx['source'], tx['target'], amount=tx['amount'], timestamp=tx['timestamp'], id=tx['id'])
 
+    report_progress(job, 0.1)
     degree_centrality = nx.degree_centrality(G)
-    betweenness_centrality = nx.betweenness_centrality(G)
+    report_progress(job, 0.2)
+    betweenness_centrality = interruptible_betweenness(G, job, 0.2, 0.6)
+    report_progress(job, 0.6)
     closeness_centrality = nx.closeness_centrality(G)
+    report_progress(job, 0.8)
 
     analysis = {
         'nodes': [],
@@ -301,32 +384,26 @@ def analyze_transactions():
         node = G.nodes[node_id]
         analysis['nodes'].append({
             'id': node_id,
-            'name': node['name'],
-            'type': node['type'],
-            'isCritical': node['isCritical'],
+            'name': node.get('name'),
+            'type': node.get('type'),
+            'isCritical': node.get('isCritical'),
             'degreeCentrality': round(degree_centrality[node_id], 4),
             'betweennessCentrality': round(betweenness_centrality[node_id], 4),
             'closenessCentrality': round(closeness_centrality[node_id], 4),
             'totalIncoming': sum(1 for _ in G.predecessors(node_id)),
             'totalOutgoing': sum(1 for _ in G.successors(node_id)),
-            'totalVolume': sum(data['amount'] for _, _, data in G.in_edges(node_id, data=True)) + sum(data['amount'] for _, _, data in G.out_edges(node_id, data=True))
+            'totalVolume': sum(data['amount'] for _, _, data in G.in_edges(node_id, data=True)) + sum(data['amount'] for _, _, data in G.out_edges(node_id, data=True)),
+            'riskScore': risk_engine.score(node_id)['riskScore']
         })
 
-    for _, tx in transactions.iterrows():
-        sender_degree = G.degree(tx['source'])
-        receiver_degree = G.degree(tx['target'])
-        tx['riskScore'] = 0
-
-        if tx['isFlagged']:
-            tx['riskScore'] += 50
-        if sender_degree > 5 or receiver_degree > 5:
-            tx['riskScore'] += 20
-        if tx['amount'] > 100:
-            tx['riskScore'] += 30
+    report_progress(job, 0.9)
 
+    for tx in transactions:
+        tx = dict(tx)
+        tx['riskScore'] = risk_engine.transaction_risk(tx)
         analysis['transactions'].append(tx)
 
-    return jsonify(analysis)
+    return analysis
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -354,27 +431,19 @@ def get_crypto_prices():
 @app.route('/api/alerts', methods=['GET'])
 def get_alerts():
     """Obtiene alertas activas del sistema"""
-    data = generate_blockchain_data()
+    data = snapshot_data(DATASET.current())
     return jsonify(data['alerts'])
 
 @app.route('/api/fund-tracing', methods=['POST'])
 def trace_funds():
     """Rastrea el flujo de fondos desde una dirección específica"""
     request_data = request.json
-    start_address = request_data.get('address')
-    max_depth = request_data.get('depth', 3)
-    
-    data = generate_blockchain_data()
-    transactions = data['transactions']
-    
-    # Construir grafo simple
-    graph = defaultdict(list)
-    for tx in transactions:
-        graph[tx['source']].append({
-            'target': tx['target'],
-            'amount': tx['amount'],
-            'transaction': tx
-        })
+    return jsonify(run_fund_tracing(request_data.get('address'), request_data.get('depth', 3)))
+
+def run_fund_tracing(start_address, max_depth=3, job=None, snapshot=None):
+    """Rastrea los caminos de fondos salientes desde una dirección (BFS)"""
+    snapshot = snapshot or DATASET.current()
+    graph = snapshot.derived('outgoing_graph', build_outgoing_graph)
     
     # Rastrear fondos usando BFS simple
     traced_paths = []
@@ -383,12 +452,13 @@ def trace_funds():
     
     while queue:
         current_node, path, depth, total_amount = queue.popleft()
+        report_progress(job, depth / max_depth if max_depth else 1)
         
         if depth >= max_depth:
             continue
             
         # Obtener transacciones salientes
-        for edge in graph[current_node]:
+        for edge in graph.get(current_node, ()):
             neighbor = edge['target']
             if neighbor not in visited or depth < 2:  # Permitir revisitar en profundidades bajas
                 new_path = path + [neighbor]
@@ -409,15 +479,140 @@ def trace_funds():
     # Ordenar por monto total descendente
     traced_paths.sort(key=lambda x: x['totalAmount'], reverse=True)
     
-    return jsonify({
+    return {
         'startAddress': start_address,
+        'snapshotVersion': snapshot.version,
         'tracedPaths': traced_paths[:10],  # Limitar a 10 caminos principales
         'summary': {
             'totalPaths': len(traced_paths),
             'maxAmount': traced_paths[0]['totalAmount'] if traced_paths else 0,
             'avgAmount': sum(p['totalAmount'] for p in traced_paths) / len(traced_paths) if traced_paths else 0
         }
-    })
+    }
+
+def build_outgoing_graph(snapshot):
+    """Lista de adyacencia de transacciones salientes por dirección"""
+    graph = defaultdict(list)
+    for tx in snapshot.transactions:
+        graph[tx['source']].append({
+            'target': tx['target'],
+            'amount': tx['amount'],
+            'transaction': tx
+        })
+    return dict(graph)
+
+JOB_MANAGER.register('analyze', lambda payload, job: run_transaction_analysis(payload, job))
+JOB_MANAGER.register(
+    'fund-tracing',
+    lambda payload, job: run_fund_tracing(payload.get('address'), payload.get('depth', 3), job, job.context)
+)
+
+# Tipos de trabajo que leen DATASET (analyze solo usa los datos enviados)
+SNAPSHOT_JOB_TYPES = ('fund-tracing',)
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Encola un análisis largo y devuelve el id del trabajo y el token para cancelarlo"""
+    request_data = request.get_json(silent=True)
+    if not isinstance(request_data, dict):
+        return jsonify({'error': 'Body must be a JSON object'}), 400
+    kind = request_data.get('type')
+    payload = request_data.get('payload', {})
+    if not isinstance(kind, str):
+        return jsonify({'error': 'Field "type" must be a string'}), 400
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Field "payload" must be an object'}), 400
+
+    # Los trabajos que leen el conjunto compartido usan la versión vigente al enviarlos
+    snapshot = DATASET.current() if kind in SNAPSHOT_JOB_TYPES else None
+    try:
+        job, token = JOB_MANAGER.submit(
+            kind,
+            payload,
+            context=snapshot,
+            version=snapshot.version if snapshot is not None else None
+        )
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    except JobQueueFull as exc:
+        return jsonify({'error': str(exc)}), 429
+
+    response = job.to_dict()
+    if token is not None:
+        response['subscriberToken'] = token
+    status_code = 200 if job.status in FINISHED_STATES else 202
+    return jsonify(response), status_code
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Consulta el estado (y el resultado, si terminó) de un trabajo"""
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancela la suscripción indicada en ?token= (el subscriberToken devuelto al
+    enviar); el trabajo se detiene cuando ningún otro cliente lo espera.
+    """
+    try:
+        job = JOB_MANAGER.cancel(job_id, request.args.get('token'))
+    except InvalidSubscriber as exc:
+        return jsonify({'error': str(exc)}), 403
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict(include_result=False))
+
+@app.route('/api/jobs/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """
+    Envía el progreso del trabajo como Server-Sent Events (opcional).
+
+    Hay pocos streams simultáneos y cada uno dura como mucho
+    JOB_STREAM_MAX_SECONDS; la forma recomendada de seguir un trabajo es
+    consultar GET /api/jobs/<id>.
+    """
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not JOB_STREAM_SLOTS.acquire(blocking=False):
+        return jsonify({'error': 'Too many open streams, poll /api/jobs/<id> instead'}), 503
+
+    # Liberación única: al terminar el generador o al cerrar la respuesta,
+    # lo que ocurra primero (en HEAD el cuerpo nunca se genera)
+    released = threading.Lock()
+
+    def release_slot():
+        if released.acquire(blocking=False):
+            JOB_STREAM_SLOTS.release()
+
+    def events():
+        try:
+            yield from job_events()
+        finally:
+            release_slot()
+
+    def job_events():
+        deadline = time.monotonic() + JOB_STREAM_MAX_SECONDS
+        version = -1
+        while time.monotonic() < deadline:
+            current = job.wait_for_change(version, timeout=min(15, max(deadline - time.monotonic(), 0)))
+            if current == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            finished = job.status in FINISHED_STATES
+            yield f"data: {json.dumps(job.to_dict(include_result=finished))}\n\n"
+            if finished:
+                return
+        # Tiempo máximo alcanzado: el cliente debe seguir consultando por polling
+        yield 'event: timeout\ndata: {}\n\n'
+
+    response = Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+    response.call_on_close(release_slot)
+    return response
 
 @app.route('/api/risk-analysis', methods=['POST'])
 def analyze_risk():
@@ -425,81 +620,83 @@ def analyze_risk():
     request_data = request.json
     address = request_data.get('address')
     
-    data = generate_blockchain_data()
-    transactions = data['transactions']
-    nodes = data['nodes']
-    
     # Encontrar información del nodo
-    node_info = next((n for n in nodes if n['id'] == address), None)
+    snapshot = DATASET.current()
+    node_info = snapshot.risk_engine.nodes.get(address)
     if not node_info:
         return jsonify({'error': 'Address not found'}), 404
     
-    # Calcular score de riesgo
-    risk_score = 0
-    risk_factors = []
-    
-    # Factor 1: Reputación del nodo
-    reputation = node_info.get('reputation', 0.5)
-    if reputation < 0.3:
-        risk_score += 40
-        risk_factors.append('Low reputation score')
-    elif reputation < 0.6:
-        risk_score += 20
-        risk_factors.append('Medium reputation score')
-    
-    # Factor 2: Tipo de nodo
-    if node_info['type'] in ['unknown', 'mixer', 'phishing']:
-        risk_score += 50
-        risk_factors.append(f'High-risk node type: {node_info["type"]}')
-    
-    # Factor 3: Lista negra
-    if address in BLACKLISTED_ADDRESSES:
-        risk_score += 60
-        risk_factors.append(f'Blacklisted address: {BLACKLISTED_ADDRESSES[address]["type"]}')
-    
-    # Factor 4: Patrones de transacción
-    addr_transactions = [tx for tx in transactions if tx['source'] == address or tx['target'] == address]
-    
-    # Transacciones de alto valor
-    high_value_txs = [tx for tx in addr_transactions if tx['amount'] > ALERT_THRESHOLDS['large_transaction']]
-    if high_value_txs:
-        risk_score += len(high_value_txs) * 10
-        risk_factors.append(f'{len(high_value_txs)} high-value transactions')
-    
-    # Transacciones flagged
-    flagged_txs = [tx for tx in addr_transactions if tx.get('isFlagged', False)]
-    if flagged_txs:
-        risk_score += len(flagged_txs) * 15
-        risk_factors.append(f'{len(flagged_txs)} flagged transactions')
-    
-    # Normalizar score (0-100)
-    risk_score = min(risk_score, 100)
-    
-    # Determinar nivel de riesgo
-    if risk_score >= 70:
-        risk_level = 'HIGH'
-        risk_color = '#ef4444'
-    elif risk_score >= 40:
-        risk_level = 'MEDIUM'
-        risk_color = '#f59e0b'
-    else:
-        risk_level = 'LOW'
-        risk_color = '#10b981'
+    # Score precalculado por el motor de riesgo
+    risk = snapshot.risk_engine.score(address)
+    features = risk['features']
     
     return jsonify({
         'address': address,
-        'riskScore': risk_score,
-        'riskLevel': risk_level,
-        'riskColor': risk_color,
-        'riskFactors': risk_factors,
+        'snapshotVersion': snapshot.version,
+        'riskScore': risk['riskScore'],
+        'riskLevel': risk['riskLevel'],
+        'riskColor': risk['riskColor'],
+        'riskFactors': risk['riskFactors'],
         'nodeInfo': node_info,
+        'features': features,
         'transactionSummary': {
-            'total': len(addr_transactions),
-            'flagged': len(flagged_txs),
-            'highValue': len(high_value_txs),
-            'totalVolume': sum(tx['amount'] for tx in addr_transactions)
+            'total': features['transactionCount'],
+            'flagged': features['flaggedCount'],
+            'highValue': features['highValueCount'],
+            'totalVolume': features['totalVolume']
         },
-        'recommendations': generate_risk_recommendations(risk_score, risk_factors)
+        'recommendations': generate_risk_recommendations(risk['riskScore'], risk['riskFactors'])
+    })
+
+# Límites de los valores ingeridos: evitan fechas fuera de rango y totales infinitos
+MAX_TIMESTAMP = 253402300799  # 9999-12-31T23:59:59Z
+MAX_TRANSACTION_AMOUNT = 1e18
+
+def validate_transaction(tx):
+    """Devuelve un mensaje de error si la transacción no es válida, o None"""
+    if not isinstance(tx, dict):
+        return 'Each transaction must be an object'
+    for field in ('id', 'source', 'target'):
+        if not isinstance(tx.get(field), str) or not tx[field]:
+            return f'Field "{field}" must be a non-empty string'
+    amount = tx.get('amount')
+    if (isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount)
+            or not 0 <= amount <= MAX_TRANSACTION_AMOUNT):
+        return f'Field "amount" must be a number between 0 and {MAX_TRANSACTION_AMOUNT:g}'
+    timestamp = tx.get('timestamp')
+    if isinstance(timestamp, bool) or not isinstance(timestamp, int) or not 0 <= timestamp <= MAX_TIMESTAMP:
+        return f'Field "timestamp" must be an integer between 0 and {MAX_TIMESTAMP} (unix seconds)'
+    try:
+        # analyze_temporal_patterns convierte a hora local
+        datetime.fromtimestamp(timestamp)
+    except (OverflowError, ValueError, OSError):
+        return 'Field "timestamp" is out of range for this server'
+    if not isinstance(tx.get('isFlagged', False), bool):
+        return 'Field "isFlagged" must be a boolean'
+    return None
+
+@app.route('/api/transactions', methods=['POST'])
+def ingest_transactions():
+    """Ingiere nuevas transacciones e invalida el riesgo de las direcciones afectadas"""
+    request_data = request.get_json(silent=True)
+    transactions = request_data.get('transactions') if isinstance(request_data, dict) else None
+    if not isinstance(transactions, list):
+        return jsonify({'error': 'Body must be an object with a "transactions" list'}), 400
+    
+    # Validar todo el lote antes de publicar nada
+    for index, tx in enumerate(transactions):
+        error = validate_transaction(tx)
+        if error:
+            return jsonify({'error': f'Transaction {index}: {error}'}), 400
+    transactions = [dict(tx, isFlagged=tx.get('isFlagged', False)) for tx in transactions]
+    
+    # Los ids ya ingeridos se omiten, así reintentar un POST no duplica transacciones
+    snapshot, touched, skipped = DATASET.ingest(transactions)
+    return jsonify({
+        'snapshotVersion': snapshot.version,
+        'ingested': len(transactions) - len(skipped),
+        'skippedDuplicates': skipped,
+        'invalidatedAddresses': sorted(touched)
     })
 
 def generate_risk_recommendations(risk_score, risk_factors):
@@ -532,7 +729,8 @@ def generate_risk_recommendations(risk_score, risk_factors):
 @app.route('/api/network-analysis', methods=['GET'])
 def get_network_analysis():
     """Análisis avanzado de la red blockchain"""
-    data = generate_blockchain_data()
+    snapshot = DATASET.current()
+    data = snapshot_data(snapshot)
     
     # Análisis temporal
     transactions = data['transactions']
@@ -545,6 +743,7 @@ def get_network_analysis():
     flow_analysis = analyze_money_flow(transactions)
     
     return jsonify({
+        'snapshotVersion': snapshot.version,
         'temporalAnalysis': time_analysis,
         'geographicAnalysis': geo_analysis,
         'flowAnalysis': flow_analysis,
@@ -676,18 +875,15 @@ def calculate_network_health(data):
 
 @app.route('/api/data', methods=['GET'])
 def get_blockchain_data():
-    data = generate_blockchain_data()
+    data = snapshot_data(DATASET.current())
     return jsonify(data)
 
 # Ruta para servir el frontend
 @app.route('/')
 def serve_frontend():
-    return send_from_directory(app.static_folder, 'index.html')
+    return STATIC_ASSETS.serve('index.html')
 
 # Ruta catch-all para el enrutamiento del frontend (SPA)
 @app.route('/<path:path>')
 def serve_static(path):
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
\ No newline at end of file
+    return STATIC_ASSETS.serve(path)
\ No newline at end of file
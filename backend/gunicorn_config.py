@@ -1,4 +1,5 @@
 bind = "0.0.0.0:10000"
-workers = 2
-threads = 4
+# Un solo worker: la cola de trabajos (/api/jobs) vive en memoria del proceso
+workers = 1
+threads = 8
 timeout = 120
@@ -0,0 +1,247 @@
+"""
+Cola de trabajos asíncronos para análisis de larga duración.
+
+Los análisis pesados (/api/analyze, /api/fund-tracing) se ejecutan en un pool
+de hilos acotado en lugar de ocupar un hilo de gunicorn durante toda la
+petición. El cliente recibe un id de trabajo y consulta el progreso y el
+resultado con GET /api/jobs/<id> (el stream SSE es opcional y limitado).
+
+El estado de los trabajos vive en memoria del proceso, por eso
+gunicorn_config.py usa un solo worker (con más hilos): así todas las consultas
+de un trabajo, la deduplicación y la caché de resultados ven la misma cola.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Estados posibles de un trabajo
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Se lanza dentro de la tarea cuando el trabajo fue cancelado"""
+
+
+class JobQueueFull(Exception):
+    """Se lanza al enviar un trabajo cuando la cola de pendientes está llena"""
+
+
+class InvalidSubscriber(Exception):
+    """Se lanza al cancelar con un token que no pertenece al trabajo"""
+
+
+class Job:
+    """Estado de un trabajo enviado a la cola"""
+
+    def __init__(self, job_id, kind, key, context=None):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        # Datos fijados al enviar el trabajo (por ejemplo, un snapshot)
+        self.context = context
+        self.status = PENDING
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.cancel_event = threading.Event()
+        # Tokens de los clientes que enviaron esta misma petición (deduplicada)
+        self.subscribers = set()
+        # Se notifica en cada cambio de progreso o estado (usado por el stream)
+        self.changed = threading.Condition()
+        self.version = 0
+
+    def report(self, progress):
+        """Actualiza el progreso (0-1) y aborta si se pidió cancelar"""
+        self.check_cancelled()
+        self._update(progress=min(max(progress, 0.0), 1.0))
+
+    def check_cancelled(self):
+        """Punto de cancelación: las tareas deben llamarlo entre pasos costosos"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def _update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """Bloquea hasta que cambie el estado o expire el timeout"""
+        with self.changed:
+            if self.version == version:
+                self.changed.wait(timeout)
+            return self.version
+
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'subscribers': len(self.subscribers),
+            'createdAt': self.created_at,
+            'finishedAt': self.finished_at
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.status == COMPLETED:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Pool de trabajos acotado con deduplicación y caché de resultados.
+
+    - Peticiones idénticas en curso comparten el mismo trabajo.
+    - Los resultados completados se guardan en una caché LRU de tamaño
+      máximo `cache_size`, de modo que repetir la petición responde al instante.
+    - Como mucho `max_pending` trabajos en curso o en espera; al superarlo
+      `submit` lanza JobQueueFull.
+    """
+
+    def __init__(self, max_workers=2, cache_size=64, max_pending=16):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.jobs = {}                 # id -> Job en curso
+        self.in_flight = {}            # clave -> id del trabajo en curso
+        self.finished = OrderedDict()  # id -> Job terminado (LRU)
+        self.results = {}              # clave -> id del trabajo completado
+        self.tasks = {}                # tipo -> función(payload, job)
+
+    def register(self, kind, func):
+        """Registra la función que ejecuta los trabajos de un tipo"""
+        self.tasks[kind] = func
+
+    @staticmethod
+    def make_key(kind, payload, version=None):
+        raw = json.dumps({'type': kind, 'payload': payload, 'version': version}, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def submit(self, kind, payload, context=None, version=None):
+        """
+        Encola un trabajo y devuelve (Job, token de suscriptor).
+
+        El Job puede ser nuevo, uno idéntico en curso o uno ya completado en
+        caché (en ese caso el token es None, no hay nada que cancelar). El
+        token identifica a este cliente al cancelar.
+
+        `version` forma parte de la clave de deduplicación, de modo que un
+        resultado calculado sobre datos anteriores no se reutiliza.
+        """
+        if not isinstance(kind, str) or kind not in self.tasks:
+            raise ValueError(f'Unknown job type: {kind}')
+
+        key = self.make_key(kind, payload, version)
+        token = uuid.uuid4().hex
+        with self.lock:
+            cached_id = self.results.get(key)
+            if cached_id is not None:
+                self.finished.move_to_end(cached_id)
+                return self.finished[cached_id], None
+
+            running_id = self.in_flight.get(key)
+            if running_id is not None:
+                job = self.jobs[running_id]
+                job.subscribers.add(token)
+                return job, token
+
+            if len(self.jobs) >= self.max_pending:
+                raise JobQueueFull(f'Too many pending jobs (max {self.max_pending})')
+
+            job = Job(uuid.uuid4().hex, kind, key, context)
+            job.subscribers.add(token)
+            self.jobs[job.id] = job
+            self.in_flight[key] = job.id
+            job.future = self.executor.submit(self._run, job, self.tasks[kind], payload)
+            return job, token
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id) or self.finished.get(job_id)
+            if job is not None and job.id in self.finished:
+                self.finished.move_to_end(job.id)
+            return job
+
+    def cancel(self, job_id, token):
+        """
+        Retira el suscriptor `token` del trabajo y lo cancela cuando no queda ninguno.
+
+        Un trabajo deduplicado sigue ejecutándose mientras otro cliente lo
+        espere. La cancelación de uno en ejecución es cooperativa: surte efecto
+        en el siguiente punto de cancelación de la tarea. Lanza
+        InvalidSubscriber si el token no corresponde a un suscriptor activo.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id) or self.finished.get(job_id)
+            if job is None or job.status in FINISHED_STATES:
+                return job
+            if token not in job.subscribers:
+                raise InvalidSubscriber('Invalid subscriber token')
+            job.subscribers.discard(token)
+            if job.subscribers:
+                return job
+
+            # Sin suscriptores: se marca cancelado y se retira de la deduplicación
+            # antes de soltar el lock, así un submit nuevo crea otro trabajo
+            job.cancel_event.set()
+            if self.in_flight.get(job.key) == job.id:
+                del self.in_flight[job.key]
+            # Si todavía no empezó, el pool no llega a ejecutarlo
+            not_started = job.future is not None and job.future.cancel()
+
+        if not_started:
+            self._finish(job, status=CANCELLED)
+        return job
+
+    def _run(self, job, func, payload):
+        if job.cancel_event.is_set():
+            self._finish(job, status=CANCELLED)
+            return
+
+        job._update(status=RUNNING)
+        try:
+            result = func(payload, job)
+        except JobCancelled:
+            self._finish(job, status=CANCELLED)
+        except Exception as exc:
+            self._finish(job, status=FAILED, error=str(exc))
+        else:
+            self._finish(job, status=COMPLETED, result=result, progress=1.0)
+
+    def _finish(self, job, **fields):
+        with self.lock:
+            if job.status in FINISHED_STATES:
+                return
+            self.jobs.pop(job.id, None)
+            if self.in_flight.get(job.key) == job.id:
+                del self.in_flight[job.key]
+
+            self.finished[job.id] = job
+            if fields['status'] == COMPLETED:
+                self.results[job.key] = job.id
+
+            while len(self.finished) > self.cache_size:
+                _, evicted = self.finished.popitem(last=False)
+                if self.results.get(evicted.key) == evicted.id:
+                    del self.results[evicted.key]
+
+            # Liberar el contexto: los trabajos terminados pueden quedar en caché
+            job._update(finished_at=time.time(), context=None, **fields)
@@ -0,0 +1,251 @@
+"""
+Motor de riesgo unificado basado en vectores de características por dirección.
+
+Las características de cada dirección (grado, volúmenes, transacciones
+marcadas, de alto valor, riesgo de contrapartes y contactos con lista negra)
+se mantienen como contadores que cada ingesta actualiza solo con el lote
+nuevo; el score se guarda en caché y solo se invalidan las direcciones que
+participan en las transacciones ingeridas.
+
+Un motor no admite escrituras concurrentes: para ingerir sin afectar a los
+lectores se usa `fork()`, que agrega una capa vacía (LayeredMap) sobre los
+datos del original y solo escribe en ella lo que la ingesta modifica.
+"""
+import copy
+
+from snapshots import LayeredMap
+
+# Pesos de cada factor de riesgo (compartidos por direcciones y transacciones)
+RISK_WEIGHTS = {
+    'low_reputation': 40,
+    'medium_reputation': 20,
+    'high_risk_type': 50,
+    'blacklisted': 60,
+    'high_value_tx': 10,      # por transacción de alto valor
+    'flagged_tx': 15,         # por transacción marcada
+    'blacklist_hit': 10,      # por transacción con una contraparte en lista negra
+    'high_degree': 20,        # más de HIGH_DEGREE contrapartes
+    'counterparty_risk': 0.2  # fracción del riesgo propio de la peor contraparte
+}
+
+HIGH_RISK_TYPES = ('unknown', 'mixer', 'phishing')
+HIGH_DEGREE = 5
+
+# Contadores de una dirección sin transacciones
+EMPTY_STATS = {
+    'inDegree': 0,
+    'outDegree': 0,
+    'transactionCount': 0,
+    'incomingVolume': 0,
+    'outgoingVolume': 0,
+    'flaggedCount': 0,
+    'highValueCount': 0,
+    'counterpartyRisk': 0,
+    'blacklistHits': 0
+}
+
+
+def placeholder_node(address):
+    """Nodo mínimo para una dirección que solo aparece en transacciones ingeridas"""
+    return {
+        'id': address,
+        'name': 'Unlisted Address',
+        'isCritical': False,
+        'type': 'wallet',
+        'region': 'Unknown',
+        'reputation': 0.5
+    }
+
+
+def risk_level(risk_score):
+    """Devuelve el nivel y color asociados a un score (0-100)"""
+    if risk_score >= 70:
+        return 'HIGH', '#ef4444'
+    elif risk_score >= 40:
+        return 'MEDIUM', '#f59e0b'
+    return 'LOW', '#10b981'
+
+
+class RiskEngine:
+    """Calcula y memoriza características y scores de riesgo por dirección"""
+
+    def __init__(self, nodes, transactions=(), blacklist=None, large_transaction=100.0):
+        self.nodes = LayeredMap({node['id']: node for node in nodes})
+        self.blacklist = blacklist or {}
+        self.large_transaction = large_transaction
+        self._links = LayeredMap()   # (origen, destino) -> True
+        self._stats = LayeredMap()   # dirección -> contadores de sus transacciones
+        self._scores = LayeredMap()
+        self.ingest(transactions)
+
+    def fork(self):
+        """Copia en escritura: comparte todos los datos del original hasta que se modifiquen"""
+        clone = copy.copy(self)
+        clone.nodes = self.nodes.child()
+        clone._links = self._links.child()
+        clone._stats = self._stats.child()
+        clone._scores = self._scores.child()
+        return clone
+
+    def ingest(self, transactions):
+        """
+        Agrega transacciones y recalcula solo las direcciones afectadas.
+
+        Los contadores de cada dirección se actualizan solo con el lote nuevo,
+        sin recorrer su historial. Las direcciones que no son nodos conocidos
+        se registran con `placeholder_node`, de modo que todo lo que se puntúa
+        se puede consultar.
+        """
+        for tx in transactions:
+            for address in (tx['source'], tx['target']):
+                if address not in self.nodes:
+                    self.nodes[address] = placeholder_node(address)
+
+        # Los contadores existentes pueden estar compartidos con otro fork: se copian
+        updated = {}
+        for tx in transactions:
+            source, target = tx['source'], tx['target']
+            new_link = (source, target) not in self._links
+            if new_link:
+                self._links[(source, target)] = True
+
+            for address in {source, target}:
+                stats = updated.get(address)
+                if stats is None:
+                    stats = updated[address] = dict(self._stats.get(address, EMPTY_STATS))
+                self._count(stats, address, tx, new_link)
+
+        for address, stats in updated.items():
+            self._stats[address] = stats
+
+        touched = set(updated)
+        self.invalidate(touched)
+        # Precalcular para que las lecturas no tengan que recomputar
+        for address in touched:
+            self.score(address)
+        return touched
+
+    def _count(self, stats, address, tx, new_link):
+        """Suma una transacción a los contadores de `address`"""
+        if tx['source'] == address:
+            stats['outDegree'] += new_link
+            stats['outgoingVolume'] += tx['amount']
+        if tx['target'] == address:
+            stats['inDegree'] += new_link
+            stats['incomingVolume'] += tx['amount']
+        stats['transactionCount'] += 1
+        if tx.get('isFlagged', False):
+            stats['flaggedCount'] += 1
+        if tx['amount'] > self.large_transaction:
+            stats['highValueCount'] += 1
+
+        counterparty = tx['target'] if tx['source'] == address else tx['source']
+        if counterparty in self.blacklist:
+            stats['blacklistHits'] += 1
+        if counterparty != address:
+            # Los nodos y la lista negra no cambian, así que el máximo se mantiene
+            stats['counterpartyRisk'] = max(stats['counterpartyRisk'], self.intrinsic_risk(counterparty))
+
+    def invalidate(self, addresses):
+        for address in addresses:
+            self._scores.pop(address)
+
+    def intrinsic_risk(self, address):
+        """Riesgo propio de la dirección (reputación, tipo y lista negra)"""
+        score, _ = self._intrinsic_factors(address)
+        return min(score, 100)
+
+    def _intrinsic_factors(self, address):
+        node_info = self.nodes.get(address, {})
+        score = 0
+        factors = []
+
+        reputation = node_info.get('reputation', 0.5)
+        if reputation < 0.3:
+            score += RISK_WEIGHTS['low_reputation']
+            factors.append('Low reputation score')
+        elif reputation < 0.6:
+            score += RISK_WEIGHTS['medium_reputation']
+            factors.append('Medium reputation score')
+
+        if node_info.get('type') in HIGH_RISK_TYPES:
+            score += RISK_WEIGHTS['high_risk_type']
+            factors.append(f'High-risk node type: {node_info["type"]}')
+
+        if address in self.blacklist:
+            score += RISK_WEIGHTS['blacklisted']
+            factors.append(f'Blacklisted address: {self.blacklist[address]["type"]}')
+
+        return score, factors
+
+    def features(self, address):
+        """Vector de características de la dirección a partir de sus contadores"""
+        stats = self._stats.get(address, EMPTY_STATS)
+        return {
+            'degree': stats['inDegree'] + stats['outDegree'],
+            'transactionCount': stats['transactionCount'],
+            'incomingVolume': stats['incomingVolume'],
+            'outgoingVolume': stats['outgoingVolume'],
+            'totalVolume': stats['incomingVolume'] + stats['outgoingVolume'],
+            'flaggedCount': stats['flaggedCount'],
+            'highValueCount': stats['highValueCount'],
+            'counterpartyRisk': stats['counterpartyRisk'],
+            'blacklistHits': stats['blacklistHits']
+        }
+
+    def score(self, address):
+        """Score de riesgo (0-100) y factores de la dirección (memorizado)"""
+        cached = self._scores.get(address)
+        if cached is not None:
+            return cached
+
+        features = self.features(address)
+        risk_score, risk_factors = self._intrinsic_factors(address)
+
+        if features['highValueCount']:
+            risk_score += features['highValueCount'] * RISK_WEIGHTS['high_value_tx']
+            risk_factors.append(f'{features["highValueCount"]} high-value transactions')
+
+        if features['flaggedCount']:
+            risk_score += features['flaggedCount'] * RISK_WEIGHTS['flagged_tx']
+            risk_factors.append(f'{features["flaggedCount"]} flagged transactions')
+
+        if features['blacklistHits']:
+            risk_score += features['blacklistHits'] * RISK_WEIGHTS['blacklist_hit']
+            risk_factors.append(f'{features["blacklistHits"]} transactions with blacklisted counterparties')
+
+        if features['degree'] > HIGH_DEGREE:
+            risk_score += RISK_WEIGHTS['high_degree']
+            risk_factors.append(f'High connectivity: {features["degree"]} counterparty links')
+
+        counterparty_score = round(features['counterpartyRisk'] * RISK_WEIGHTS['counterparty_risk'])
+        if counterparty_score:
+            risk_score += counterparty_score
+            risk_factors.append(f'Counterparty risk: {features["counterpartyRisk"]}')
+
+        risk_score = min(risk_score, 100)
+        level, color = risk_level(risk_score)
+        result = {
+            'riskScore': risk_score,
+            'riskLevel': level,
+            'riskColor': color,
+            'riskFactors': risk_factors,
+            'features': features
+        }
+        self._scores[address] = result
+        return result
+
+    def transaction_risk(self, tx):
+        """
+        Score de riesgo de una transacción: promedio de los scores (en caché)
+        de emisor y receptor más los factores propios de la transacción, con
+        los mismos pesos que se usan por dirección.
+        """
+        risk_score = round((self.score(tx['source'])['riskScore'] + self.score(tx['target'])['riskScore']) / 2)
+        if tx.get('isFlagged', False):
+            risk_score += RISK_WEIGHTS['flagged_tx']
+        if tx['amount'] > self.large_transaction:
+            risk_score += RISK_WEIGHTS['high_value_tx']
+        if tx['source'] in self.blacklist or tx['target'] in self.blacklist:
+            risk_score += RISK_WEIGHTS['blacklist_hit']
+        return min(risk_score, 100)
@@ -0,0 +1,198 @@
+"""
+Snapshots versionados del conjunto de datos (copia en escritura).
+
+Los lectores toman la versión actual con `current()` y trabajan sobre ella sin
+bloqueos: un snapshot publicado nunca se modifica. El escritor construye la
+siguiente versión a partir de la actual y la publica reemplazando una sola
+referencia, de modo que una ingesta no detiene lecturas y un análisis largo
+no bloquea la ingesta.
+
+Las versiones comparten los datos que no cambian mediante estructuras por
+capas (`LayeredMap`, `AppendLog`): una ingesta solo escribe una capa nueva con
+lo que modifica. Las capas de tamaño parecido se fusionan (como en un contador
+binario), así que hay O(log n) capas y el costo de una ingesta es
+proporcional al lote por O(log n) amortizado, no al total de datos.
+"""
+import threading
+import time
+
+_MISSING = object()
+_DELETED = object()
+
+
+class LayeredMap:
+    """
+    Diccionario persistente por capas.
+
+    `child()` crea una versión nueva con una capa vacía sobre la actual; las
+    escrituras van a esa capa y las lecturas bajan por las capas hasta
+    encontrar la clave. Una capa con hijos solo recibe escrituras idempotentes
+    (memorización de valores que no cambian en las versiones hijas).
+    """
+
+    def __init__(self, data=None, parent=None):
+        self._data = dict(data or {})
+        self._parent = parent
+
+    def child(self):
+        """
+        Versión nueva con una capa vacía encima de la actual.
+
+        Antes se fusionan las capas superiores mientras la de abajo no sea más
+        grande que lo acumulado, de modo que los tamaños crecen hacia la base.
+        """
+        # dict() es atómico frente a escrituras concurrentes de lectores
+        data = dict(self._data)
+        parent = self._parent
+        while parent is not None and len(parent._data) <= len(data):
+            merged = dict(parent._data)
+            merged.update(data)
+            data = merged
+            parent = parent._parent
+        if parent is None:
+            data = {key: value for key, value in data.items() if value is not _DELETED}
+        # Las versiones anteriores conservan sus propias capas
+        base = LayeredMap(data, parent) if data or parent is None else parent
+        return LayeredMap(parent=base)
+
+    def get(self, key, default=None):
+        layer = self
+        while layer is not None:
+            value = layer._data.get(key, _MISSING)
+            if value is not _MISSING:
+                return default if value is _DELETED else value
+            layer = layer._parent
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def pop(self, key, default=None):
+        value = self.get(key, default)
+        if self._parent is None:
+            self._data.pop(key, None)
+        else:
+            self._data[key] = _DELETED
+        return value
+
+    def to_dict(self):
+        layers = []
+        layer = self
+        while layer is not None:
+            layers.append(layer)
+            layer = layer._parent
+        flat = {}
+        for layer in reversed(layers):
+            # dict.update es atómico frente a escrituras concurrentes de lectores
+            flat.update(layer._data)
+        return {key: value for key, value in flat.items() if value is not _DELETED}
+
+
+class AppendLog:
+    """Secuencia persistente de solo agregado; cada versión comparte los lotes anteriores"""
+
+    def __init__(self, items=(), parent=None):
+        self._items = tuple(items)
+        self._parent = parent
+        self._length = len(self._items) + (len(parent) if parent is not None else 0)
+
+    def append(self, items):
+        """
+        Nueva versión con `items` al final (la actual no cambia).
+
+        Los últimos lotes se fusionan mientras no sean más grandes que lo
+        agregado: quedan O(log n) lotes y cada elemento se copia O(log n) veces.
+        """
+        items = tuple(items)
+        parent = self
+        while parent is not None and len(parent._items) <= len(items):
+            items = parent._items + items
+            parent = parent._parent
+        return AppendLog(items, parent)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        chunks = []
+        layer = self
+        while layer is not None:
+            chunks.append(layer._items)
+            layer = layer._parent
+        for chunk in reversed(chunks):
+            yield from chunk
+
+
+class Snapshot:
+    """Versión inmutable de nodos, transacciones y motor de riesgo"""
+
+    def __init__(self, version, nodes, transactions, risk_engine, transaction_ids):
+        self.version = version
+        self.nodes = nodes
+        self.transactions = transactions
+        self.transaction_ids = transaction_ids
+        self.risk_engine = risk_engine
+        self.created_at = time.time()
+        self._derived = {}
+
+    def derived(self, name, factory):
+        """Valor derivado del snapshot, calculado una sola vez por versión"""
+        value = self._derived.get(name)
+        if value is None:
+            # Si dos lectores lo calculan a la vez, ambos obtienen el mismo resultado
+            value = self._derived.setdefault(name, factory(self))
+        return value
+
+
+class SnapshotStore:
+    """Publica versiones sucesivas del conjunto de datos"""
+
+    def __init__(self, nodes, transactions, risk_engine):
+        self._write_lock = threading.Lock()
+        transactions = tuple(transactions)
+        transaction_ids = LayeredMap({tx['id']: True for tx in transactions})
+        self._current = Snapshot(0, AppendLog(nodes), AppendLog(transactions), risk_engine, transaction_ids)
+
+    def current(self):
+        """Snapshot publicado más reciente (lectura sin bloqueo)"""
+        return self._current
+
+    def ingest(self, transactions):
+        """
+        Crea y publica una nueva versión con las transacciones agregadas.
+
+        Las transacciones cuyo id ya existe (en el snapshot o antes en el mismo
+        lote) se omiten. Devuelve (snapshot, direcciones afectadas, ids omitidos);
+        si no queda nada que agregar no se publica una versión nueva.
+        """
+        # Solo se serializan los escritores; los lectores siguen usando la versión anterior
+        with self._write_lock:
+            base = self._current
+            transaction_ids = base.transaction_ids.child()
+            batch = []
+            skipped = []
+            for tx in transactions:
+                if tx['id'] in transaction_ids:
+                    skipped.append(tx['id'])
+                    continue
+                transaction_ids[tx['id']] = True
+                batch.append(dict(tx))
+            if not batch:
+                return base, set(), skipped
+
+            risk_engine = base.risk_engine.fork()
+            touched = risk_engine.ingest(batch)
+            new_nodes = [risk_engine.nodes[a] for a in sorted(touched) if a not in base.risk_engine.nodes]
+            nodes = base.nodes.append(new_nodes) if new_nodes else base.nodes
+            snapshot = Snapshot(base.version + 1, nodes, base.transactions.append(batch), risk_engine, transaction_ids)
+            self._current = snapshot
+        return snapshot, touched, skipped
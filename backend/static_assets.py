@@ -0,0 +1,149 @@
+"""
+Servidor en memoria de los archivos estáticos del frontend (dist/).
+
+El directorio se indexa una sola vez al iniciar: cada archivo queda en memoria
+junto con sus variantes comprimidas (gzip y, si está instalado el módulo
+`brotli`, br) y su ETag. Las peticiones se responden desde esa tabla sin tocar
+el sistema de archivos.
+
+También se puede ejecutar como script para precomprimir dist/ durante el build:
+
+    python backend/static_assets.py dist
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # incluido en requirements.txt; sin él (p. ej. en desarrollo) solo se sirve gzip
+    brotli = None
+
+# Archivos generados por Vite con hash en el nombre (ej. assets/index-sLg0Ikvf.js)
+HASHED_ASSET = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[a-z0-9]+$')
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.mjs', '.css', '.json', '.svg', '.txt', '.map', '.xml')
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+REVALIDATE_CACHE = 'no-cache'
+
+
+def compress_variants(content):
+    """Genera las variantes comprimidas de un contenido"""
+    variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(content)
+    return variants
+
+
+def precompress(root):
+    """Escribe archivos .gz/.br junto a cada archivo comprimible de `root`"""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                content = f.read()
+            if len(content) < MIN_COMPRESS_SIZE:
+                continue
+            for encoding, data in compress_variants(content).items():
+                suffix = '.gz' if encoding == 'gzip' else '.br'
+                with open(path + suffix, 'wb') as f:
+                    f.write(data)
+
+
+class StaticAsset:
+    """Archivo estático en memoria con sus variantes y cabeceras"""
+
+    def __init__(self, path, content, variants):
+        self.path = path
+        self.content = content
+        self.variants = variants
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = hashlib.sha1(content).hexdigest()[:16]
+
+        if HASHED_ASSET.match(path):
+            self.cache_control = IMMUTABLE_CACHE
+        elif path == 'index.html':
+            self.cache_control = REVALIDATE_CACHE
+        else:
+            self.cache_control = DEFAULT_CACHE
+
+
+class StaticAssets:
+    """Tabla de archivos estáticos indexada al iniciar la aplicación"""
+
+    def __init__(self, root, index='index.html'):
+        self.root = root
+        self.index = index
+        self.assets = {}
+        if os.path.isdir(root):
+            self._load()
+
+    def _load(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                with open(full_path, 'rb') as f:
+                    content = f.read()
+                self.assets[path] = StaticAsset(path, content, self._variants(full_path, content))
+
+    def _variants(self, full_path, content):
+        if not full_path.endswith(COMPRESSIBLE_EXTENSIONS) or len(content) < MIN_COMPRESS_SIZE:
+            return {}
+
+        # Preferir las variantes generadas en el build; comprimir solo las que falten
+        variants = {}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.exists(full_path + suffix):
+                with open(full_path + suffix, 'rb') as f:
+                    variants[encoding] = f.read()
+        for encoding, data in compress_variants(content).items():
+            variants.setdefault(encoding, data)
+        return variants
+
+    def lookup(self, path):
+        """Busca el archivo pedido o, para rutas del SPA, index.html"""
+        asset = self.assets.get(path)
+        if asset is not None:
+            return asset
+        # Un recurso de assets/ inexistente no debe responderse con HTML
+        if path.startswith('assets/'):
+            return None
+        return self.assets.get(self.index)
+
+    def serve(self, path):
+        asset = self.lookup(path)
+        if asset is None:
+            return Response('Not Found', status=404, mimetype='text/plain')
+
+        body = asset.content
+        etag = asset.etag
+        headers = {'Cache-Control': asset.cache_control, 'Vary': 'Accept-Encoding'}
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.variants and request.accept_encodings[encoding]:
+                body = asset.variants[encoding]
+                # Cada codificación tiene bytes distintos, así que su propio ETag
+                etag = f'{asset.etag}-{encoding}'
+                headers['Content-Encoding'] = encoding
+                break
+        headers['ETag'] = f'"{etag}"'
+
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype=asset.mimetype, headers=headers)
+
+
+if __name__ == '__main__':
+    precompress(sys.argv[1] if len(sys.argv) > 1 else 'dist')
@@ -0,0 +1,88 @@
+import pytest
+
+import app as app_module
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {'transactions': [5]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': '5', 'timestamp': 1}]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': 5}]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': 5, 'timestamp': '1'}]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': 5, 'timestamp': 10 ** 20}]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': 5, 'timestamp': -1}]},
+    {'transactions': [{'id': 'a', 'source': 'x', 'target': 'y', 'amount': 1e300, 'timestamp': 1}]},
+    {'transactions': 'nope'},
+    [1]
+])
+def test_ingest_rejects_invalid_transactions(client, body):
+    assert client.post('/api/transactions', json=body).status_code == 400
+
+
+def test_rejected_transactions_do_not_break_reads(client):
+    client.post('/api/transactions', json={'transactions': [
+        {'id': 'overflow', 'source': '0x1a2b3c', 'target': '0xq', 'amount': 1, 'timestamp': 10 ** 20}
+    ]})
+    assert client.get('/api/network-analysis').status_code == 200
+
+
+def test_retried_ingest_is_not_counted_twice(client):
+    body = {'transactions': [
+        {'id': 'retry_1', 'source': '0xRETRY', 'target': '0x7g8h9i', 'amount': 500, 'timestamp': 1700000000,
+         'isFlagged': True}
+    ]}
+    first = client.post('/api/transactions', json=body).json
+    second = client.post('/api/transactions', json=body).json
+    assert first['ingested'] == 1
+    assert second['ingested'] == 0
+    assert second['skippedDuplicates'] == ['retry_1']
+
+    risk = client.post('/api/risk-analysis', json={'address': '0xRETRY'}).json
+    assert risk['transactionSummary']['flagged'] == 1
+
+
+def test_ingested_unknown_address_can_be_analyzed(client):
+    response = client.post('/api/transactions', json={'transactions': [
+        {'id': 'ingest_1', 'source': '0xAAA', 'target': '0x112233', 'amount': 5, 'timestamp': 1700000000}
+    ]})
+    assert response.status_code == 200
+    assert '0xAAA' in response.json['invalidatedAddresses']
+
+    assert client.post('/api/risk-analysis', json={'address': '0xAAA'}).status_code == 200
+    assert client.get('/api/network-analysis').status_code == 200
+
+
+@pytest.mark.parametrize('body', [
+    {'type': ['x']},
+    {'type': 'fund-tracing', 'payload': [1]},
+    {'type': 'nope'},
+    [1]
+])
+def test_submit_job_rejects_invalid_requests(client, body):
+    assert client.post('/api/jobs', json=body).status_code == 400
+
+
+def test_submit_returns_subscriber_token_and_cancel_checks_it(client):
+    job = client.post('/api/jobs', json={'type': 'fund-tracing', 'payload': {'address': '0xTOKEN'}}).json
+    assert 'subscriberToken' in job
+    assert client.delete('/api/jobs/missing?token=x').status_code == 404
+
+
+def test_head_stream_releases_slot(client):
+    job = client.post('/api/jobs', json={'type': 'fund-tracing', 'payload': {'address': '0xHEAD'}}).json
+    slots = app_module.JOB_STREAM_SLOTS._value
+    for _ in range(slots + 2):
+        # El servidor WSGI siempre cierra la respuesta, aunque no lea el cuerpo
+        client.head(f"/api/jobs/{job['id']}/stream").close()
+    assert app_module.JOB_STREAM_SLOTS._value == slots
+
+    for _ in range(slots + 2):
+        response = client.get(f"/api/jobs/{job['id']}/stream")
+        assert response.status_code == 200
+        response.close()
+    assert app_module.JOB_STREAM_SLOTS._value == slots
@@ -0,0 +1,151 @@
+import threading
+
+import pytest
+
+from jobs import CANCELLED, COMPLETED, RUNNING, InvalidSubscriber, JobCancelled, JobManager, JobQueueFull
+
+
+def wait(job, status, timeout=5):
+    version = -1
+    for _ in range(100):
+        if job.status == status:
+            return
+        version = job.wait_for_change(version, timeout / 100)
+    assert job.status == status
+
+
+def make_manager(**kwargs):
+    manager = JobManager(**kwargs)
+    manager.register('echo', lambda payload, job: payload)
+    return manager
+
+
+def blocking_task(started, release):
+    def task(payload, job):
+        started.set()
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return payload
+    return task
+
+
+def test_identical_requests_share_one_job():
+    started, release = threading.Event(), threading.Event()
+    manager = make_manager()
+    manager.register('slow', blocking_task(started, release))
+
+    first, first_token = manager.submit('slow', {'a': 1})
+    second, second_token = manager.submit('slow', {'a': 1})
+    other, _ = manager.submit('slow', {'a': 2})
+    assert first is second
+    assert first_token != second_token
+    assert other is not first
+    assert first.to_dict()['subscribers'] == 2
+
+    release.set()
+    wait(first, COMPLETED)
+    # Un resultado completado se devuelve desde la caché
+    assert manager.submit('slow', {'a': 1}) == (first, None)
+
+
+def test_version_is_part_of_the_key():
+    manager = make_manager()
+    job, _ = manager.submit('echo', {'a': 1}, version=1)
+    wait(job, COMPLETED)
+    assert manager.submit('echo', {'a': 1}, version=1)[0] is job
+    assert manager.submit('echo', {'a': 1}, version=2)[0] is not job
+
+
+def test_lru_evicts_oldest_finished_job():
+    manager = make_manager(cache_size=2)
+    jobs = []
+    for i in range(3):
+        job, _ = manager.submit('echo', {'i': i})
+        wait(job, COMPLETED)
+        jobs.append(job)
+
+    assert manager.get(jobs[0].id) is None
+    assert manager.get(jobs[2].id) is jobs[2]
+    # El trabajo expulsado ya no está en caché: se vuelve a ejecutar
+    assert manager.submit('echo', {'i': 0})[0] is not jobs[0]
+
+
+def test_cancel_before_run():
+    started, release = threading.Event(), threading.Event()
+    manager = make_manager(max_workers=1)
+    manager.register('slow', blocking_task(started, release))
+
+    running, _ = manager.submit('slow', {'a': 1})
+    started.wait(5)
+    queued, token = manager.submit('echo', {'b': 2})
+    manager.cancel(queued.id, token)
+    assert queued.status == CANCELLED
+
+    release.set()
+    wait(running, COMPLETED)
+    assert queued.status == CANCELLED
+
+
+def test_cancel_during_run():
+    started, release = threading.Event(), threading.Event()
+    manager = make_manager()
+    manager.register('slow', blocking_task(started, release))
+
+    job, token = manager.submit('slow', {'a': 1})
+    started.wait(5)
+    manager.cancel(job.id, token)
+    # Un trabajo cancelado no se reutiliza, ni siquiera antes de terminar
+    replacement, _ = manager.submit('slow', {'a': 1})
+    assert replacement is not job
+    wait(job, CANCELLED)
+    release.set()
+    wait(replacement, COMPLETED)
+
+
+def test_cancel_only_when_last_subscriber_leaves():
+    started, release = threading.Event(), threading.Event()
+    manager = make_manager()
+    manager.register('slow', blocking_task(started, release))
+
+    job, first_token = manager.submit('slow', {'a': 1})
+    _, second_token = manager.submit('slow', {'a': 1})
+    started.wait(5)
+
+    manager.cancel(job.id, first_token)
+    assert not job.cancel_event.is_set()
+    # El mismo cliente no puede cancelar dos veces en nombre del otro
+    with pytest.raises(InvalidSubscriber):
+        manager.cancel(job.id, first_token)
+    with pytest.raises(InvalidSubscriber):
+        manager.cancel(job.id, None)
+    assert job.status == RUNNING
+
+    manager.cancel(job.id, second_token)
+    wait(job, CANCELLED)
+    release.set()
+
+
+def test_pending_jobs_are_bounded():
+    started, release = threading.Event(), threading.Event()
+    manager = make_manager(max_workers=1, max_pending=2)
+    manager.register('slow', blocking_task(started, release))
+
+    manager.submit('slow', {'i': 1})
+    manager.submit('slow', {'i': 2})
+    with pytest.raises(JobQueueFull):
+        manager.submit('slow', {'i': 3})
+    release.set()
+
+
+def test_invalid_job_type():
+    manager = make_manager()
+    with pytest.raises(ValueError):
+        manager.submit(['echo'], {})
+
+
+def test_report_raises_after_cancel():
+    manager = make_manager()
+    job, _ = manager.submit('echo', {})
+    job.cancel_event.set()
+    with pytest.raises(JobCancelled):
+        job.report(0.5)
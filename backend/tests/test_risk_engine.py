@@ -0,0 +1,105 @@
+from app import ALERT_THRESHOLDS, BLACKLISTED_ADDRESSES, generate_blockchain_data
+from risk_engine import RiskEngine
+
+# Scores esperados para el conjunto de datos simulado de generate_blockchain_data
+BASELINE_SCORES = {
+    '0x1a2b3c': 100,
+    '0x4d5e6f': 100,
+    '0x7g8h9i': 0,
+    '0xjklmno': 0,
+    '0xpqrstu': 0,
+    '0xvwxyz0': 0,
+    '0x112233': 100,
+    '0x445566': 90,
+    '0x998877': 100,
+    '0x556644': 100
+}
+
+
+def build_engine(transactions=None):
+    data = generate_blockchain_data()
+    return RiskEngine(
+        data['nodes'],
+        data['transactions'] if transactions is None else transactions,
+        blacklist=BLACKLISTED_ADDRESSES,
+        large_transaction=ALERT_THRESHOLDS['large_transaction']
+    ), data
+
+
+def tx(tx_id, source, target, amount, flagged=False):
+    return {'id': tx_id, 'source': source, 'target': target, 'amount': amount,
+            'timestamp': 1700000000, 'isFlagged': flagged}
+
+
+def test_baseline_scores():
+    engine, _ = build_engine()
+    assert {address: engine.score(address)['riskScore'] for address in BASELINE_SCORES} == BASELINE_SCORES
+
+
+def test_baseline_transaction_scores_use_address_scores():
+    engine, data = build_engine()
+    scores = {t['id']: engine.transaction_risk(t) for t in data['transactions']}
+    assert scores['tx_002'] == 50   # (100 + 0) / 2
+    assert scores['tx_003'] == 0
+    assert scores['tx_007'] == 100
+
+
+def test_ingest_only_rescores_touched_addresses():
+    engine, _ = build_engine()
+    before = {address: engine.score(address) for address in BASELINE_SCORES}
+
+    touched = engine.ingest([tx('new_1', '0x7g8h9i', '0x998877', 500.0, flagged=True)])
+
+    assert touched == {'0x7g8h9i', '0x998877'}
+    for address, result in before.items():
+        if address in touched:
+            assert engine.score(address) is not result
+        else:
+            # El resultado en caché se reutiliza tal cual
+            assert engine.score(address) is result
+    assert engine.score('0x7g8h9i')['riskScore'] > 0
+
+
+def test_incremental_matches_full_recompute():
+    extra = [tx('new_1', '0x7g8h9i', '0x998877', 500.0, flagged=True),
+             tx('new_2', '0xpqrstu', '0x112233', 3.0)]
+    incremental, data = build_engine()
+    incremental.ingest(extra)
+    full, _ = build_engine(data['transactions'] + extra)
+
+    for address in BASELINE_SCORES:
+        assert incremental.score(address) == full.score(address)
+
+
+def test_batched_ingest_matches_full_recompute():
+    extra = [tx('new_1', '0x7g8h9i', '0x998877', 500.0, flagged=True),
+             tx('new_2', '0x7g8h9i', '0x998877', 1.0),
+             tx('new_3', '0x998877', '0x7g8h9i', 2.0),
+             tx('new_4', '0xAAA', '0xAAA', 3.0),
+             tx('new_5', '0xAAA', '0x112233', 4.0)]
+    incremental, data = build_engine()
+    for item in extra:
+        incremental = incremental.fork()
+        incremental.ingest([item])
+    full, _ = build_engine(data['transactions'] + extra)
+
+    for address in list(BASELINE_SCORES) + ['0xAAA']:
+        assert incremental.score(address) == full.score(address)
+
+
+def test_unknown_addresses_get_a_node():
+    engine, _ = build_engine()
+    engine.ingest([tx('new_1', '0xAAA', '0x112233', 5.0)])
+    assert engine.nodes['0xAAA']['id'] == '0xAAA'
+    assert engine.score('0xAAA')['features']['blacklistHits'] == 1
+
+
+def test_fork_does_not_change_original():
+    engine, _ = build_engine()
+    original = engine.score('0x7g8h9i')
+    fork = engine.fork()
+    fork.ingest([tx('new_1', '0x7g8h9i', '0xAAA', 500.0)])
+
+    assert engine.score('0x7g8h9i') is original
+    assert '0xAAA' not in engine.nodes
+    assert fork.score('0x7g8h9i')['features']['transactionCount'] == 3
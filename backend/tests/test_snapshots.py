@@ -0,0 +1,115 @@
+import threading
+
+from app import build_risk_engine, generate_blockchain_data
+from snapshots import AppendLog, LayeredMap, SnapshotStore
+
+
+def make_store():
+    data = generate_blockchain_data()
+    return SnapshotStore(data['nodes'], data['transactions'], build_risk_engine(data))
+
+
+def tx(tx_id, source, target, amount=1.0):
+    return {'id': tx_id, 'source': source, 'target': target, 'amount': amount,
+            'timestamp': 1700000000, 'isFlagged': False}
+
+
+def test_pinned_snapshot_does_not_change_after_ingest():
+    store = make_store()
+    pinned = store.current()
+    transactions = list(pinned.transactions)
+    nodes = list(pinned.nodes)
+    score = pinned.risk_engine.score('0x7g8h9i')
+
+    snapshot, _, _ = store.ingest([tx('new_1', '0x7g8h9i', '0xAAA', 500.0)])
+
+    assert snapshot.version == pinned.version + 1
+    assert store.current() is snapshot
+    assert list(pinned.transactions) == transactions
+    assert list(pinned.nodes) == nodes
+    assert pinned.risk_engine.score('0x7g8h9i') is score
+    assert pinned.risk_engine.nodes.get('0xAAA') is None
+    assert len(snapshot.transactions) == len(transactions) + 1
+    assert snapshot.risk_engine.nodes['0xAAA']['id'] == '0xAAA'
+
+
+def test_duplicate_ids_are_skipped():
+    store = make_store()
+    snapshot, touched, skipped = store.ingest([tx('new_1', '0x7g8h9i', '0xAAA'), tx('new_1', '0x7g8h9i', '0xAAA')])
+    assert skipped == ['new_1']
+    count = snapshot.risk_engine.features('0x7g8h9i')['transactionCount']
+
+    # Reintentar el mismo lote no publica una versión nueva
+    retry, touched, skipped = store.ingest([tx('new_1', '0x7g8h9i', '0xAAA'), tx('tx_001', '0x1a2b3c', '0x4d5e6f')])
+    assert retry is snapshot
+    assert touched == set()
+    assert skipped == ['new_1', 'tx_001']
+    assert retry.risk_engine.features('0x7g8h9i')['transactionCount'] == count
+
+
+def test_readers_see_consistent_versions_during_ingest():
+    store = make_store()
+    base_count = len(store.current().transactions)
+    base_links = store.current().risk_engine.features('0x445566')['transactionCount']
+    errors = []
+
+    def writer():
+        for i in range(200):
+            store.ingest([tx(f'c{i}', '0x1a2b3c', '0x445566')])
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        snapshot = store.current()
+        # Cada versión tiene exactamente una transacción más que la anterior
+        expected = base_count + snapshot.version
+        if len(list(snapshot.transactions)) != expected:
+            errors.append(snapshot.version)
+        features = snapshot.risk_engine.features('0x445566')
+        if features['transactionCount'] != base_links + snapshot.version:
+            errors.append(snapshot.version)
+    thread.join()
+
+    assert not errors
+    assert store.current().version == 200
+
+
+def layer_count(structure):
+    count = 0
+    while structure is not None:
+        count += 1
+        structure = structure._parent
+    return count
+
+
+def test_layered_map_versions_are_independent():
+    base = LayeredMap({'a': 1, 'b': 2})
+    versions = [base]
+    for i in range(100):
+        child = versions[-1].child()
+        child[f'k{i}'] = i
+        child.pop('a')
+        versions.append(child)
+
+    assert base['a'] == 1
+    assert 'a' not in versions[-1]
+    assert versions[-1]['b'] == 2
+    assert versions[3].get(f'k{10}') is None
+    assert versions[-1]['k99'] == 99
+    assert all(versions[i].get(f'k{i}') is None for i in range(1, 100))
+    assert versions[50].to_dict() == {'b': 2, **{f'k{i}': i for i in range(50)}}
+    # Las capas se fusionan: la profundidad crece de forma logarítmica
+    assert layer_count(versions[-1]) <= 10
+
+
+def test_append_log_shares_previous_batches():
+    log = AppendLog([1, 2])
+    versions = [log]
+    for i in range(100):
+        versions.append(versions[-1].append([i]))
+
+    assert list(log) == [1, 2]
+    assert list(versions[2]) == [1, 2, 0, 1]
+    assert list(versions[-1]) == [1, 2] + list(range(100))
+    assert len(versions[-1]) == 102
+    assert layer_count(versions[-1]) <= 8
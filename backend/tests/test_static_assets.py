@@ -0,0 +1,93 @@
+import gzip
+
+import pytest
+
+import app as app_module
+import static_assets
+from app import app
+from static_assets import IMMUTABLE_CACHE, StaticAssets
+
+INDEX_HTML = b'<!doctype html><div id="root"></div>' + b' ' * 2048
+BUNDLE_JS = b'console.log("bundle");\n' * 200
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_bytes(INDEX_HTML)
+    (tmp_path / 'assets' / 'index-sLg0Ikvf.js').write_bytes(BUNDLE_JS)
+    monkeypatch.setattr(app_module, 'STATIC_ASSETS', StaticAssets(str(tmp_path)))
+    return app.test_client()
+
+
+@pytest.mark.skipif(static_assets.brotli is None, reason='brotli no instalado')
+def test_prefers_brotli(client):
+    response = client.get('/assets/index-sLg0Ikvf.js', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert static_assets.brotli.decompress(response.data) == BUNDLE_JS
+
+
+@pytest.mark.parametrize('accept', ['gzip', 'gzip, br;q=0'])
+def test_serves_gzip_when_brotli_not_accepted(client, accept):
+    response = client.get('/assets/index-sLg0Ikvf.js', headers={'Accept-Encoding': accept})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == BUNDLE_JS
+
+
+@pytest.mark.parametrize('accept', [None, 'identity', 'gzip;q=0, br;q=0'])
+def test_serves_identity_without_accepted_encoding(client, accept):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    response = client.get('/assets/index-sLg0Ikvf.js', headers=headers)
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == BUNDLE_JS
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_matching_etag_returns_304(client):
+    headers = {'Accept-Encoding': 'gzip'}
+    etag = client.get('/assets/index-sLg0Ikvf.js', headers=headers).headers['ETag']
+    response = client.get('/assets/index-sLg0Ikvf.js', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # El ETag de la variante gzip no vale para la respuesta sin comprimir
+    response = client.get('/assets/index-sLg0Ikvf.js', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+
+def test_hashed_asset_is_immutable(client):
+    response = client.get('/assets/index-sLg0Ikvf.js')
+    assert response.headers['Cache-Control'] == IMMUTABLE_CACHE
+    assert response.mimetype in ('text/javascript', 'application/javascript')
+
+
+def test_index_is_revalidated(client):
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['ETag']
+    assert response.data == INDEX_HTML
+
+
+def test_spa_route_falls_back_to_index(client):
+    response = client.get('/dashboard')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/html'
+    assert response.data == INDEX_HTML
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+
+def test_missing_asset_returns_404(client):
+    response = client.get('/assets/missing-AbCdEf12.js')
+    assert response.status_code == 404
+    assert response.mimetype == 'text/plain'
+
+
+def test_prefers_precompressed_files(tmp_path):
+    (tmp_path / 'app.js').write_bytes(BUNDLE_JS)
+    static_assets.precompress(str(tmp_path))
+    (tmp_path / 'app.js.gz').write_bytes(b'from-build')
+
+    assets = StaticAssets(str(tmp_path))
+    assert assets.lookup('app.js').variants['gzip'] == b'from-build'
+    assert set(assets.assets) == {'app.js'}
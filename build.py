@@ -27,6 +27,9 @@ def main():
     # Instalar dependencias de Python
     run_command("pip install -r requirements.txt", "Instalando dependencias de Python")
     
+    # Generar variantes .gz/.br de dist/ (requiere las dependencias de Python)
+    run_command("python backend/static_assets.py dist", "Precomprimiendo archivos estáticos")
+    
     print("\n" + "="*60)
     print("✨ Build completado exitosamente!")
     print("="*60 + "\n")